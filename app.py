@@ -1,11 +1,28 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, g
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, g, make_response
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from flask_babel import Babel, gettext, lazy_gettext as _l, get_locale
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_caching import Cache
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import deferred, raiseload, selectinload, undefer
+from werkzeug.http import is_resource_modified
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import groupby
 import calendar
+import click
+import csv
+import hashlib
+import multiprocessing
+import orjson
 import os
+import sqlite3
 from pathlib import Path
 import subprocess
 from dotenv import load_dotenv
@@ -32,15 +49,43 @@ def get_available_locales():
     
     return sorted(locales)
 
+class OrjsonProvider(DefaultJSONProvider):
+    # orjson handles dates natively; anything it can't serialize falls back
+    # to Flask's default conversions. Keys are sorted like Flask's default.
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(
+            obj, default=self.default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+        ).decode()
+
+    def loads(self, s, **kwargs):
+        # The session serializer needs an object_hook, which orjson lacks
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-key-please-change-in-production')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URI', 'sqlite:///timetracker.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_pre_ping': True,
+    'pool_recycle': 1800
+}
+if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+    app.config['SQLALCHEMY_ENGINE_OPTIONS']['connect_args'] = {'check_same_thread': False}
+else:
+    # Pool sizing only applies to QueuePool; in-memory SQLite uses StaticPool
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'].update({'pool_size': 10, 'max_overflow': 20})
 app.config['BABEL_DEFAULT_LOCALE'] = 'en'
 app.config['BABEL_SUPPORTED_LOCALES'] = get_available_locales()
 app.config['BABEL_TRANSLATION_DIRECTORIES'] = 'translations'
 app.config['SESSION_PERMANENT'] = True
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=365)
+app.config['CACHE_TYPE'] = os.getenv('CACHE_TYPE', 'SimpleCache')
+for cache_option in ('CACHE_DIR', 'CACHE_REDIS_URL'):
+    if os.getenv(cache_option):
+        app.config[cache_option] = os.getenv(cache_option)
 
 def locale_selector():
     # Check if user has set a language preference in session
@@ -60,28 +105,39 @@ def compile_translations_if_needed():
     if not po_files:
         return
 
-    needs_compile = False
-    for po_file in po_files:
-        mo_file = po_file.with_suffix('.mo')
-        if not mo_file.exists() or mo_file.stat().st_mtime < po_file.stat().st_mtime:
-            needs_compile = True
-            break
-
-    if not needs_compile:
-        return
+    mo_files = [po_file.with_suffix('.mo') for po_file in po_files]
+    if all(mo_file.exists() for mo_file in mo_files):
+        newest_po = max(po_file.stat().st_mtime for po_file in po_files)
+        oldest_mo = min(mo_file.stat().st_mtime for mo_file in mo_files)
+        if oldest_mo >= newest_po:
+            return
 
     try:
         subprocess.run(['pybabel', 'compile', '-d', str(translations_dir)], check=True)
     except Exception as exc:
         print(f"Translation compile skipped: {exc}")
 
-compile_translations_if_needed()
+@app.cli.command('compile-translations')
+def compile_translations_command():
+    """Compile translation catalogs that are missing or out of date."""
+    compile_translations_if_needed()
 
 # Make get_locale available in templates
 app.jinja_env.globals.update(get_locale=get_locale)
 app.jinja_env.globals.update(_=gettext)
 
 db = SQLAlchemy(app)
+cache = Cache(app)
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers continue while a write is in progress, and
+    # synchronous=NORMAL is safe with WAL while fsyncing far less often
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
@@ -91,21 +147,45 @@ def make_session_permanent():
     session.permanent = True
     app.permanent_session_lifetime = timedelta(days=365)
 
+# OWASP recommended argon2id parameters (19 MiB memory, 2 iterations)
+password_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+
+def hash_password(password):
+    # Module-level so it can be sent to multiprocessing workers
+    return password_hasher.hash(password)
+
 # Models
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(200))
+    # Only needed on login, so keep it out of the per-request user load
+    password_hash = deferred(db.Column(db.String(200)))
     is_admin = db.Column(db.Boolean, default=False)
-    time_entries = db.relationship('TimeEntry', backref='user', lazy=True)
-    leave_entries = db.relationship('LeaveEntry', backref='user', lazy=True)
+    time_entries = db.relationship('TimeEntry', back_populates='user', lazy='select')
+    leave_entries = db.relationship('LeaveEntry', back_populates='user', lazy='select')
+    projects = db.relationship('Project', back_populates='owner', lazy='select')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        # Older accounts still have Werkzeug scrypt/pbkdf2 hashes; they are
+        # upgraded to argon2 on the next successful login
+        if not self.password_hash:
+            return False
+        if not self.password_hash.startswith('$argon2'):
+            if not check_password_hash(self.password_hash, password):
+                return False
+            self.set_password(password)
+            return True
+        try:
+            password_hasher.verify(self.password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+        if password_hasher.check_needs_rehash(self.password_hash):
+            self.set_password(password)
+        return True
 
 class Project(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -114,8 +194,9 @@ class Project(db.Model):
     description = db.Column(db.Text)
     active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    time_entries = db.relationship('TimeEntry', backref='project', lazy=True)
-    owner = db.relationship('User', backref='projects', foreign_keys=[user_id])
+    time_entries = db.relationship('TimeEntry', back_populates='project', lazy='select')
+    targets = db.relationship('ProjectTarget', back_populates='project', lazy='select')
+    owner = db.relationship('User', back_populates='projects', foreign_keys=[user_id])
 
 class TimeEntry(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -127,6 +208,12 @@ class TimeEntry(db.Model):
     is_restid = db.Column(db.Boolean, default=False)
     tracktamente = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    user = db.relationship('User', back_populates='time_entries')
+    project = db.relationship('Project', back_populates='time_entries')
+    __table_args__ = (
+        db.Index('ix_time_entry_user_date', 'user_id', 'date'),
+        db.Index('ux_time_entry_user_proj_date_restid', 'user_id', 'project_id', 'date', 'is_restid', unique=True),
+    )
 
 class LeaveEntry(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -136,6 +223,10 @@ class LeaveEntry(db.Model):
     end_date = db.Column(db.Date, nullable=False)
     description = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    user = db.relationship('User', back_populates='leave_entries')
+    __table_args__ = (
+        db.Index('ix_leave_user_range', 'user_id', 'start_date', 'end_date'),
+    )
 
 class ProjectTarget(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -145,7 +236,10 @@ class ProjectTarget(db.Model):
     month = db.Column(db.Integer, nullable=False)
     target_percentage = db.Column(db.Float, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    project = db.relationship('Project', backref='targets')
+    project = db.relationship('Project', back_populates='targets')
+    __table_args__ = (
+        db.Index('ix_target_user_ym', 'user_id', 'year', 'month'),
+    )
 
 class UserHolidaySetting(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -155,6 +249,26 @@ class UserHolidaySetting(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user = db.relationship('User', backref=db.backref('holiday_setting', uselist=False))
 
+class UserDataChange(db.Model):
+    # When any data shown on the user's month and report pages last
+    # changed; drives the conditional (304) responses for those pages
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class MonthlyProjectSummary(db.Model):
+    # Hours and entry count per user, month and project, kept up to date by
+    # triggers on time_entry so reports don't have to scan TimeEntry
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    project_id = db.Column(db.Integer, nullable=False, default=0)  # 0 for hours without a project (restid)
+    hours = db.Column(db.Float, nullable=False, default=0)
+    entries = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (
+        db.Index('ux_monthly_summary_user_ym_project', 'user_id', 'year', 'month', 'project_id', unique=True),
+    )
+
 HOLIDAY_COUNTRIES = {
     'SE': 'Sweden',
     'NO': 'Norway',
@@ -165,6 +279,172 @@ HOLIDAY_COUNTRIES = {
     'US': 'United States'
 }
 
+def create_missing_indexes():
+    # Older databases may hold several rows per project and day, which
+    # would block the unique index; keep the newest one of each
+    with db.engine.begin() as connection:
+        connection.execute(db.text(
+            'DELETE FROM time_entry WHERE project_id IS NOT NULL AND id NOT IN ('
+            'SELECT MAX(id) FROM time_entry WHERE project_id IS NOT NULL '
+            'GROUP BY user_id, project_id, date, is_restid)'
+        ))
+
+    # create_all() skips tables that already exist, so add any indexes
+    # introduced after the database was first created
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+    # ix_time_entry_user_proj_date is a prefix of the unique
+    # ux_time_entry_user_proj_date_restid and no longer needed
+    with db.engine.begin() as connection:
+        connection.execute(db.text('DROP INDEX IF EXISTS ix_time_entry_user_proj_date'))
+
+# The summary is maintained by the database itself, so every write to
+# time_entry updates it in the same statement and transaction
+_SUMMARY_ADD = """
+    INSERT INTO monthly_project_summary (user_id, year, month, project_id, hours, entries)
+    VALUES (NEW.user_id, CAST(strftime('%Y', NEW.date) AS INTEGER), CAST(strftime('%m', NEW.date) AS INTEGER),
+            COALESCE(NEW.project_id, 0), NEW.hours, 1)
+    ON CONFLICT (user_id, year, month, project_id)
+    DO UPDATE SET hours = hours + excluded.hours, entries = entries + 1;
+"""
+_SUMMARY_MATCH_OLD = """
+    WHERE user_id = OLD.user_id
+      AND year = CAST(strftime('%Y', OLD.date) AS INTEGER)
+      AND month = CAST(strftime('%m', OLD.date) AS INTEGER)
+      AND project_id = COALESCE(OLD.project_id, 0)"""
+_SUMMARY_REMOVE = (
+    'UPDATE monthly_project_summary SET hours = hours - OLD.hours, entries = entries - 1'
+    + _SUMMARY_MATCH_OLD + ';\n'
+    + 'DELETE FROM monthly_project_summary' + _SUMMARY_MATCH_OLD + ' AND entries <= 0;\n'
+)
+MONTHLY_SUMMARY_TRIGGERS = [
+    'CREATE TRIGGER IF NOT EXISTS time_entry_summary_insert AFTER INSERT ON time_entry BEGIN'
+    + _SUMMARY_ADD + 'END',
+    'CREATE TRIGGER IF NOT EXISTS time_entry_summary_update'
+    ' AFTER UPDATE OF user_id, project_id, date, hours ON time_entry BEGIN\n'
+    + _SUMMARY_REMOVE + _SUMMARY_ADD + 'END',
+    'CREATE TRIGGER IF NOT EXISTS time_entry_summary_delete AFTER DELETE ON time_entry BEGIN\n'
+    + _SUMMARY_REMOVE + 'END',
+]
+
+def rebuild_monthly_summary():
+    from sqlalchemy import Integer, cast, func
+    db.session.query(MonthlyProjectSummary).delete()
+    year = cast(func.strftime('%Y', TimeEntry.date), Integer)
+    month = cast(func.strftime('%m', TimeEntry.date), Integer)
+    project_id = func.coalesce(TimeEntry.project_id, 0)
+    rows = db.session.query(
+        TimeEntry.user_id, year, month, project_id, func.sum(TimeEntry.hours), func.count(TimeEntry.id)
+    ).group_by(TimeEntry.user_id, year, month, project_id).all()
+    db.session.add_all(
+        MonthlyProjectSummary(user_id=user_id, year=year, month=month, project_id=project_id,
+                              hours=hours, entries=entries)
+        for user_id, year, month, project_id, hours, entries in rows
+    )
+    db.session.commit()
+
+def ensure_monthly_summary():
+    with db.engine.begin() as connection:
+        for trigger in MONTHLY_SUMMARY_TRIGGERS:
+            connection.execute(db.text(trigger))
+    if not MonthlyProjectSummary.query.first() and TimeEntry.query.first():
+        rebuild_monthly_summary()
+
+def mark_user_data_changed(user_id):
+    stmt = sqlite_insert(UserDataChange).values(user_id=user_id, changed_at=datetime.utcnow())
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id'],
+        set_={'changed_at': stmt.excluded.changed_at}
+    )
+    db.session.execute(stmt)
+
+# Fallback for users without a recorded change since this process started
+DATA_CHANGED_FALLBACK = datetime.utcnow()
+
+def get_data_changed_at(user_id):
+    change = db.session.get(UserDataChange, user_id)
+    return change.changed_at if change else DATA_CHANGED_FALLBACK
+
+def render_conditional(render):
+    # The ETag also covers what the page depends on besides the user's data:
+    # the user, locale, admin menu and, for reports, the current date
+    last_modified = get_data_changed_at(current_user.id)
+    etag = hashlib.sha1('|'.join([
+        request.path,
+        str(current_user.id),
+        last_modified.isoformat(),
+        str(get_locale()),
+        str(current_user.is_admin),
+        datetime.now().date().isoformat()
+    ]).encode()).hexdigest()
+
+    # Pending flash messages are rendered into the page, so always render then
+    if '_flashes' not in session and not is_resource_modified(
+            request.environ, etag=etag, last_modified=last_modified):
+        response = make_response('', 304)
+    else:
+        response = make_response(render())
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.max_age = 0
+    response.cache_control.must_revalidate = True
+    return response
+
+@app.cli.command('rebuild-monthly-summary')
+def rebuild_monthly_summary_command():
+    """Recalculate the monthly project summary from all time entries."""
+    rebuild_monthly_summary()
+
+@app.cli.command('import-users')
+@click.argument('csv_file', type=click.File(encoding='utf-8'))
+def import_users_command(csv_file):
+    """Create users from a CSV file with username,email,password[,is_admin] rows."""
+    existing_usernames = {username for (username,) in db.session.query(User.username)}
+    existing_emails = {email for (email,) in db.session.query(User.email)}
+
+    rows = []
+    bad_lines = []
+    for line_number, row in enumerate(csv.reader(csv_file), start=1):
+        if not any(cell.strip() for cell in row):
+            continue
+        row = [cell.strip() for cell in row]
+        # Optional header row
+        if line_number == 1 and row[0].lower() == 'username':
+            continue
+        if len(row) not in (3, 4) or not all(row[:3]):
+            bad_lines.append(line_number)
+            continue
+        username, email = row[0], row[1]
+        if username in existing_usernames or email in existing_emails:
+            click.echo(f"Skipping {username}: username or email already exists")
+            continue
+        existing_usernames.add(username)
+        existing_emails.add(email)
+        rows.append(row)
+
+    # Validate the whole file before hashing or inserting anything
+    if bad_lines:
+        raise click.BadParameter(
+            'expected username,email,password[,is_admin] on line(s) '
+            + ', '.join(str(line_number) for line_number in bad_lines),
+            param_hint='CSV_FILE'
+        )
+
+    # Hashing is deliberately slow, so spread it across all cores
+    with multiprocessing.Pool() as pool:
+        password_hashes = pool.map(hash_password, [row[2] for row in rows])
+
+    for row, password_hash in zip(rows, password_hashes):
+        is_admin = len(row) > 3 and row[3].lower() in ('1', 'true', 'yes')
+        user = User(username=row[0], email=row[1], is_admin=is_admin)
+        user.password_hash = password_hash
+        db.session.add(user)
+    db.session.commit()
+    click.echo(f"Created {len(rows)} users")
+
 @login_manager.user_loader
 def load_user(user_id):
     return db.session.get(User, int(user_id))
@@ -176,10 +456,17 @@ def index():
         return redirect(url_for('dashboard'))
     return redirect(url_for('login'))
 
+# Once the first account exists it stays that way, so remember it per process
+_users_exist = None
+
 @app.route('/register', methods=['GET', 'POST'])
 def register():
+    global _users_exist
+
     # Only allow registration if no users exist (first user setup)
-    if User.query.count() > 0:
+    if not _users_exist:
+        _users_exist = db.session.query(User.id).first() is not None
+    if _users_exist:
         flash('Kontakta en administratör för att skapa ett konto', 'error')
         return redirect(url_for('login'))
     
@@ -192,6 +479,7 @@ def register():
         user.set_password(password)
         db.session.add(user)
         db.session.commit()
+        _users_exist = True
         
         flash('Första administratörskonto skapat! Logga in.', 'success')
         return redirect(url_for('login'))
@@ -203,9 +491,11 @@ def login():
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
-        user = User.query.filter_by(username=username).first()
+        user = User.query.options(undefer(User.password_hash)).filter_by(username=username).first()
         
         if user and user.check_password(password):
+            # Persist a rehashed password, if check_password upgraded it
+            db.session.commit()
             login_user(user)
             return redirect(url_for('dashboard'))
         
@@ -236,73 +526,123 @@ def get_or_create_holiday_setting(user_id):
         db.session.commit()
     return setting
 
-def get_holiday_dates_for_year(year, setting):
+def get_holiday_country(setting):
+    # None when the user has turned holidays off
     if not setting.use_holidays:
-        return set()
+        return None
 
     country_code = setting.country_code or 'SE'
     if country_code not in HOLIDAY_COUNTRIES:
         country_code = 'SE'
+    return country_code
+
+@lru_cache(maxsize=64)
+def get_country_holiday_dates(country_code, year):
+    if country_code is None:
+        return frozenset()
 
     try:
-        return holidays_lib.country_holidays(country_code, years=[year])
+        # Plain date set so per-day membership tests are simple hash lookups
+        return frozenset(holidays_lib.country_holidays(country_code, years=[year]).keys())
     except Exception:
-        return set()
+        return frozenset()
+
+def get_holiday_dates_for_year(year, setting):
+    return get_country_holiday_dates(get_holiday_country(setting), year)
+
+WEEKDAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+
+@lru_cache(maxsize=256)
+def get_month_skeleton(year, month, locale, holiday_country):
+    # Everything about a month that doesn't depend on the user's entries:
+    # the translated month name and (date, weekday name, is_weekend,
+    # is_holiday) per day. The locale is part of the key since gettext
+    # uses the request locale.
+    holiday_dates = get_country_holiday_dates(holiday_country, year)
+    days = []
+    for day in range(1, calendar.monthrange(year, month)[1] + 1):
+        date = datetime(year, month, day)
+        weekday = date.weekday()
+        days.append((
+            date,
+            gettext(WEEKDAY_NAMES[weekday]),
+            weekday in [5, 6],
+            date.date() in holiday_dates
+        ))
+    return gettext(MONTH_NAMES[month - 1]), tuple(days)
 
 def build_month_context(year, month):
     holiday_setting = get_or_create_holiday_setting(current_user.id)
-    holiday_dates = get_holiday_dates_for_year(year, holiday_setting)
+    month_name, skeleton = get_month_skeleton(
+        year, month, str(get_locale()), get_holiday_country(holiday_setting)
+    )
 
     # Get user's projects
     projects = Project.query.filter_by(user_id=current_user.id, active=True).all()
     
     # Get month data
-    num_days = calendar.monthrange(year, month)[1]
     month_data = []
-    
-    weekdays = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    
     working_days = 0
+
+    # Fetch the whole month in two queries and bucket by date
+    first_day = skeleton[0][0].date()
+    last_day = skeleton[-1][0].date()
+
+    # Plain column rows ordered by date (no ORM objects), grouped per day
+    # in a single pass: per-day hours, restid and project totals
+    project_hours_by_date = {}
+    restid_by_date = {}
+    project_totals = {project.id: 0 for project in projects}
+    month_rows = db.session.query(
+        TimeEntry.date,
+        TimeEntry.project_id,
+        TimeEntry.hours,
+        TimeEntry.is_restid,
+        TimeEntry.tracktamente
+    ).filter(
+        TimeEntry.user_id == current_user.id,
+        TimeEntry.date.between(first_day, last_day)
+    ).order_by(TimeEntry.date, TimeEntry.id).all()
+    for entry_date, day_rows in groupby(month_rows, key=lambda row: row.date):
+        day_hours = {}
+        for row in day_rows:
+            if row.is_restid:
+                restid_by_date[entry_date] = row
+            else:
+                day_hours[row.project_id] = row.hours
+                project_totals[row.project_id] = project_totals.get(row.project_id, 0) + row.hours
+        if day_hours:
+            project_hours_by_date[entry_date] = day_hours
+
+    leaves_by_date = {}
+    month_leaves = LeaveEntry.query.options(raiseload('*')).filter(
+        LeaveEntry.user_id == current_user.id,
+        LeaveEntry.start_date <= last_day,
+        LeaveEntry.end_date >= first_day
+    ).order_by(LeaveEntry.id).all()
+    for leave in month_leaves:
+        leave_day = max(leave.start_date, first_day)
+        leave_end = min(leave.end_date, last_day)
+        while leave_day <= leave_end:
+            leaves_by_date.setdefault(leave_day, leave)
+            leave_day += timedelta(days=1)
+
+    no_hours = {}
     
-    for day in range(1, num_days + 1):
-        date = datetime(year, month, day)
-        weekday = date.weekday()
-        
-        # Get translated weekday name
-        weekday_name = gettext(weekdays[weekday])
+    for date, weekday_name, is_weekend, is_holiday in skeleton:
+        day_date = date.date()
         
-        # Check if holiday
-        is_holiday = date.date() in holiday_dates
-        is_weekend = weekday in [5, 6]
-        
-        # Get time entries for this day
-        entries = TimeEntry.query.filter_by(
-            user_id=current_user.id,
-            date=date.date()
-        ).all()
-        
-        restid_hours = 0
-        restid_tracktamente = False
-        project_entries = []
-        
-        for entry in entries:
-            if entry.is_restid:
-                restid_hours = entry.hours
-                restid_tracktamente = entry.tracktamente
-            else:
-                project_entries.append(entry)
+        # Get time entries for this day; days without project hours share
+        # one empty dict, missing projects render as empty cells
+        project_hours = project_hours_by_date.get(day_date, no_hours)
+        restid = restid_by_date.get(day_date)
+        restid_hours = restid.hours if restid else 0
+        restid_tracktamente = restid.tracktamente if restid else False
         
         # Get leave entries for this day
-        leave = LeaveEntry.query.filter(
-            LeaveEntry.user_id == current_user.id,
-            LeaveEntry.start_date <= date.date(),
-            LeaveEntry.end_date >= date.date()
-        ).first()
-        
-        # Create project hours dict
-        project_hours = {project.id: 0 for project in projects}
-        for entry in project_entries:
-            project_hours[entry.project_id] = entry.hours
+        leave = leaves_by_date.get(day_date)
         
         day_total = sum(project_hours.values()) + restid_hours
         
@@ -322,19 +662,10 @@ def build_month_context(year, month):
         })
     
     # Calculate totals
-    project_totals = {project.id: 0 for project in projects}
-    for day in month_data:
-        for project_id, hours in day['project_hours'].items():
-            project_totals[project_id] += hours
-    
     total_hours = sum(project_totals.values())
     required_hours = working_days * 8
     difference = total_hours - required_hours
     
-    months = ['January', 'February', 'March', 'April', 'May', 'June',
-              'July', 'August', 'September', 'October', 'November', 'December']
-    month_name = gettext(months[month-1])
-    
     return {
         'year': year,
         'month': month,
@@ -354,14 +685,16 @@ def build_month_context(year, month):
 @app.route('/month/<int:year>/<int:month>')
 @login_required
 def month_view(year, month):
-    context = build_month_context(year, month)
-    return render_template('month_view.html', **context)
+    return render_conditional(
+        lambda: render_template('month_view.html', **build_month_context(year, month))
+    )
 
 @app.route('/month/<int:year>/<int:month>/print')
 @login_required
 def month_print(year, month):
-    context = build_month_context(year, month)
-    return render_template('print_timereport.html', **context)
+    return render_conditional(
+        lambda: render_template('print_timereport.html', **build_month_context(year, month))
+    )
 
 @app.route('/holiday-settings', methods=['GET', 'POST'])
 @login_required
@@ -378,6 +711,7 @@ def holiday_settings():
 
         setting.use_holidays = use_holidays
         setting.country_code = country_code
+        mark_user_data_changed(current_user.id)
         db.session.commit()
         flash(gettext('Holiday settings updated'), 'success')
         return redirect(url_for('holiday_settings'))
@@ -443,26 +777,21 @@ def add_time_entry():
                 if entry:
                     db.session.delete(entry)
     else:
-        # Check if entry exists for this project
-        entry = TimeEntry.query.filter_by(
+        # Insert or update the entry for this project in one statement
+        stmt = sqlite_insert(TimeEntry).values(
             user_id=current_user.id,
             project_id=project_id,
             date=date,
+            hours=hours,
             is_restid=False
-        ).first()
-        
-        if entry:
-            entry.hours = hours
-        else:
-            entry = TimeEntry(
-                user_id=current_user.id,
-                project_id=project_id,
-                date=date,
-                hours=hours,
-                is_restid=False
-            )
-            db.session.add(entry)
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'project_id', 'date', 'is_restid'],
+            set_={'hours': stmt.excluded.hours}
+        )
+        db.session.execute(stmt)
     
+    mark_user_data_changed(current_user.id)
     db.session.commit()
     return jsonify({'success': True})
 
@@ -484,6 +813,7 @@ def add_project():
     
     project = Project(user_id=current_user.id, name=name, description=description)
     db.session.add(project)
+    mark_user_data_changed(current_user.id)
     db.session.commit()
     
     flash('Projekt tillagt!', 'success')
@@ -497,6 +827,7 @@ def toggle_project(project_id):
         flash('Åtkomst nekad', 'error')
         return redirect(url_for('projects'))
     project.active = not project.active
+    mark_user_data_changed(current_user.id)
     db.session.commit()
     flash(f'Projekt {"aktiverat" if project.active else "inaktiverat"}', 'success')
     return redirect(url_for('projects'))
@@ -523,6 +854,7 @@ def add_leave():
         description=description
     )
     db.session.add(leave)
+    mark_user_data_changed(current_user.id)
     db.session.commit()
     
     flash('Frånvaro tillagd!', 'success')
@@ -537,6 +869,7 @@ def delete_leave(leave_id):
         return redirect(url_for('leave'))
     
     db.session.delete(leave)
+    mark_user_data_changed(current_user.id)
     db.session.commit()
     flash('Frånvaro borttagen', 'success')
     return redirect(url_for('leave'))
@@ -575,12 +908,13 @@ def project_targets():
             )
             db.session.add(target)
         
+        mark_user_data_changed(current_user.id)
         db.session.commit()
         flash('Målprocent uppdaterad!', 'success')
         return redirect(url_for('project_targets', year=year, month=month))
     
     projects = Project.query.filter_by(user_id=current_user.id, active=True).all()
-    targets = ProjectTarget.query.filter_by(
+    targets = ProjectTarget.query.options(selectinload(ProjectTarget.project)).filter_by(
         user_id=current_user.id,
         year=year,
         month=month
@@ -598,7 +932,7 @@ def project_targets():
 @app.route('/delete_target/<int:target_id>')
 @login_required
 def delete_target(target_id):
-    target = ProjectTarget.query.get_or_404(target_id)
+    target = db.get_or_404(ProjectTarget, target_id)
     if target.user_id != current_user.id:
         flash('Åtkomst nekad', 'error')
         return redirect(url_for('project_targets'))
@@ -606,49 +940,90 @@ def delete_target(target_id):
     year = target.year
     month = target.month
     db.session.delete(target)
+    mark_user_data_changed(current_user.id)
     db.session.commit()
     flash('Målprocent borttagen', 'success')
     return redirect(url_for('project_targets', year=year, month=month))
 
-@app.route('/reports')
-@login_required
-def reports():
-    # Get summary for current year
-    current_year = datetime.now().year
-    holiday_setting = get_or_create_holiday_setting(current_user.id)
+@cache.memoize(timeout=600)
+def _compute_reports(user_id, today, data_changed_at):
+    # data_changed_at is only part of the cache key: any write gives the
+    # user a new key, in every worker, without explicit invalidation
+    current_year = today.year
+    holiday_setting = get_or_create_holiday_setting(user_id)
     holiday_cache = {}
+    year_start = datetime(current_year, 1, 1).date()
+    next_year_start = datetime(current_year + 1, 1, 1).date()
     
-    # Total hours per project
-    from sqlalchemy import func
-    project_summary = db.session.query(
+    # Total hours per project, tracktamente days and travel time (restid)
+    # for the current year in one scan; restid rows have no project and
+    # end up in the group without a name
+    from sqlalchemy import and_, case, func
+    year_rows = db.session.query(
         Project.name,
-        func.sum(TimeEntry.hours).label('total_hours')
-    ).join(TimeEntry).filter(
-        TimeEntry.user_id == current_user.id,
-        func.strftime('%Y', TimeEntry.date) == str(current_year)
+        func.sum(case((TimeEntry.is_restid == False, TimeEntry.hours), else_=0)).label('total_hours'),
+        func.sum(case((and_(TimeEntry.is_restid == True, TimeEntry.tracktamente == True), 1), else_=0)).label('tracktamente_days'),
+        func.sum(case((TimeEntry.is_restid == True, TimeEntry.hours), else_=0)).label('travel_hours')
+    ).select_from(TimeEntry).outerjoin(Project, TimeEntry.project_id == Project.id).filter(
+        TimeEntry.user_id == user_id,
+        TimeEntry.date >= year_start,
+        TimeEntry.date < next_year_start
     ).group_by(Project.name).all()
+
+    project_summary = [(row.name, row.total_hours) for row in year_rows if row.name is not None]
+    tracktamente_count = sum(row.tracktamente_days or 0 for row in year_rows)
+    travel_time = float(sum(row.travel_hours or 0 for row in year_rows))
     
     # Leave summary
     leave_summary = db.session.query(
         LeaveEntry.leave_type,
         func.count(LeaveEntry.id).label('count')
     ).filter(
-        LeaveEntry.user_id == current_user.id,
-        func.strftime('%Y', LeaveEntry.start_date) == str(current_year)
+        LeaveEntry.user_id == user_id,
+        LeaveEntry.start_date >= year_start,
+        LeaveEntry.start_date < next_year_start
     ).group_by(LeaveEntry.leave_type).all()
 
     # Monthly totals for last 12 months
-    today = datetime.now().date()
     start_month = (today.replace(day=1) - timedelta(days=365)).replace(day=1)
+    # Monthly totals and monthly per project come from the pre-aggregated
+    # summary; rows without a project (restid) only count towards the totals
     monthly_rows = db.session.query(
-        func.strftime('%Y-%m', TimeEntry.date).label('month'),
-        func.sum(TimeEntry.hours).label('total_hours')
-    ).filter(
-        TimeEntry.user_id == current_user.id,
-        TimeEntry.date >= start_month
-    ).group_by('month').order_by('month').all()
+        MonthlyProjectSummary.year,
+        MonthlyProjectSummary.month,
+        Project.name.label('project_name'),
+        MonthlyProjectSummary.hours
+    ).outerjoin(Project, MonthlyProjectSummary.project_id == Project.id).filter(
+        MonthlyProjectSummary.user_id == user_id,
+        MonthlyProjectSummary.year * 12 + MonthlyProjectSummary.month >= start_month.year * 12 + start_month.month
+    ).order_by(MonthlyProjectSummary.year, MonthlyProjectSummary.month).all()
 
-    monthly_totals = {row.month: float(row.total_hours or 0) for row in monthly_rows}
+    monthly_totals = {}
+    monthly_project_map = {}
+    for row in monthly_rows:
+        month_str = f'{row.year:04d}-{row.month:02d}'
+        hours = float(row.hours or 0)
+        monthly_totals[month_str] = monthly_totals.get(month_str, 0) + hours
+        if row.project_name is not None:
+            monthly_project_map.setdefault(month_str, {})[row.project_name] = hours
+
+    # Collect every leave day in the reported months once instead of
+    # querying per day
+    leave_days = set()
+    if monthly_totals:
+        last_year, last_month = (int(part) for part in max(monthly_totals).split('-'))
+        window_end = datetime(last_year, last_month, calendar.monthrange(last_year, last_month)[1]).date()
+        window_leaves = LeaveEntry.query.options(raiseload('*')).filter(
+            LeaveEntry.user_id == user_id,
+            LeaveEntry.start_date <= window_end,
+            LeaveEntry.end_date >= start_month
+        ).all()
+        for leave in window_leaves:
+            leave_day = max(leave.start_date, start_month)
+            leave_end = min(leave.end_date, window_end)
+            while leave_day <= leave_end:
+                leave_days.add(leave_day)
+                leave_day += timedelta(days=1)
 
     # Calculate monthly working days and vacation days
     monthly_working_days = {}
@@ -669,20 +1044,14 @@ def reports():
         num_days = calendar.monthrange(year_val, month_val)[1]
         
         for day in range(1, num_days + 1):
-            date = datetime(year_val, month_val, day)
+            date = datetime(year_val, month_val, day).date()
             weekday = date.weekday()
-            is_holiday = date.date() in holiday_dates
+            is_holiday = date in holiday_dates
             is_weekend = weekday in [5, 6]
             
             if not is_holiday and not is_weekend:
                 # Check if it's a vacation day
-                leave = LeaveEntry.query.filter(
-                    LeaveEntry.user_id == current_user.id,
-                    LeaveEntry.start_date <= date.date(),
-                    LeaveEntry.end_date >= date.date()
-                ).first()
-                
-                if leave:
+                if date in leave_days:
                     vacation_days += 1
                 else:
                     working_days += 1
@@ -701,36 +1070,18 @@ def reports():
     for month, hours in monthly_totals.items():
         target = monthly_target_hours.get(month, 160)
         percent = (hours / target * 100) if target > 0 else 0
-        monthly_percentages[month] = round(percent, 1)
-
-    # Monthly per project for last 12 months
-    monthly_project_rows = db.session.query(
-        func.strftime('%Y-%m', TimeEntry.date).label('month'),
-        Project.name.label('project_name'),
-        func.sum(TimeEntry.hours).label('total_hours')
-    ).join(Project, TimeEntry.project_id == Project.id).filter(
-        TimeEntry.user_id == current_user.id,
-        TimeEntry.date >= start_month
-    ).group_by('month', 'project_name').order_by('month').all()
-
-    monthly_project_map = {}
-    for row in monthly_project_rows:
-        monthly_project_map.setdefault(row.month, {})[row.project_name] = float(row.total_hours or 0)
+        monthly_percentages[month] = percent
 
-    # Get project targets for each month
-    monthly_targets = {}
-    for month_str in monthly_totals.keys():
-        year_month = month_str.split('-')
-        year_val = int(year_month[0])
-        month_val = int(year_month[1])
-        
-        targets = ProjectTarget.query.filter_by(
-            user_id=current_user.id,
-            year=year_val,
-            month=month_val
-        ).all()
-        
-        monthly_targets[month_str] = {t.project_id: t.target_percentage for t in targets}
+    # Get project targets for each month in one query
+    monthly_targets = {month_str: {} for month_str in monthly_totals.keys()}
+    window_targets = ProjectTarget.query.options(raiseload('*')).filter(
+        ProjectTarget.user_id == user_id,
+        ProjectTarget.year * 12 + ProjectTarget.month >= start_month.year * 12 + start_month.month
+    ).all()
+    for t in window_targets:
+        month_str = f'{t.year:04d}-{t.month:02d}'
+        if month_str in monthly_targets:
+            monthly_targets[month_str][t.project_id] = t.target_percentage
 
     # Yearly totals for last 5 years
     start_year = today.year - 4
@@ -738,55 +1089,51 @@ def reports():
         func.strftime('%Y', TimeEntry.date).label('year'),
         func.sum(TimeEntry.hours).label('total_hours')
     ).filter(
-        TimeEntry.user_id == current_user.id,
-        func.strftime('%Y', TimeEntry.date) >= str(start_year)
+        TimeEntry.user_id == user_id,
+        TimeEntry.date >= datetime(start_year, 1, 1).date()
     ).group_by('year').order_by('year').all()
 
     yearly_totals = {row.year: float(row.total_hours or 0) for row in yearly_rows}
 
     # Project percentage current year
     project_percentages = []
-    total_year_hours = sum([float(r.total_hours or 0) for r in project_summary])
+    total_year_hours = sum([float(total_hours or 0) for _, total_hours in project_summary])
     for project_name, total_hours in project_summary:
         hours = float(total_hours or 0)
         percent = (hours / total_year_hours * 100) if total_year_hours > 0 else 0
         project_percentages.append({
             'project': project_name,
             'hours': hours,
-            'percent': round(percent, 1)
+            'percent': percent
         })
 
-    # Tracktamente days and travel time (restid)
-    tracktamente_count = db.session.query(func.count(TimeEntry.id)).filter(
-        TimeEntry.user_id == current_user.id,
-        TimeEntry.is_restid == True,
-        TimeEntry.tracktamente == True,
-        func.strftime('%Y', TimeEntry.date) == str(current_year)
-    ).scalar() or 0
+    return {
+        'project_summary': project_summary,
+        'leave_summary': [tuple(row) for row in leave_summary],
+        'year': current_year,
+        'monthly_totals': monthly_totals,
+        'monthly_percentages': monthly_percentages,
+        'monthly_target_hours': monthly_target_hours,
+        'monthly_working_days': monthly_working_days,
+        'monthly_vacation_days': monthly_vacation_days,
+        'monthly_project_map': monthly_project_map,
+        'monthly_targets': monthly_targets,
+        'yearly_totals': yearly_totals,
+        'project_percentages': project_percentages,
+        'tracktamente_count': tracktamente_count,
+        'travel_time': travel_time
+    }
 
-    travel_time = db.session.query(func.sum(TimeEntry.hours)).filter(
-        TimeEntry.user_id == current_user.id,
-        TimeEntry.is_restid == True,
-        func.strftime('%Y', TimeEntry.date) == str(current_year)
-    ).scalar() or 0
-    travel_time = float(travel_time)
-
-    return render_template('reports.html',
-                         project_summary=project_summary,
-                         leave_summary=leave_summary,
-                         year=current_year,
-                         monthly_totals=monthly_totals,
-                         monthly_percentages=monthly_percentages,
-                         monthly_target_hours=monthly_target_hours,
-                         monthly_working_days=monthly_working_days,
-                         monthly_vacation_days=monthly_vacation_days,
-                         monthly_project_map=monthly_project_map,
-                         monthly_targets=monthly_targets,
-                         yearly_totals=yearly_totals,
-                         project_percentages=project_percentages,
-                         tracktamente_count=tracktamente_count,
-                         travel_time=travel_time,
-                         projects=Project.query.filter_by(user_id=current_user.id, active=True).all())
+@app.route('/reports')
+@login_required
+def reports():
+    # Get summary for current year
+    def render():
+        context = _compute_reports(current_user.id, datetime.now().date(), get_data_changed_at(current_user.id))
+        return render_template('reports.html',
+                             projects=Project.query.filter_by(user_id=current_user.id, active=True).all(),
+                             **context)
+    return render_conditional(render)
 
 @app.route('/admin/users')
 @login_required
@@ -858,6 +1205,8 @@ def admin_delete_user(user_id):
         flash('Du kan inte ta bort ditt eget konto', 'error')
         return redirect(url_for('admin_users'))
     
+    MonthlyProjectSummary.query.filter_by(user_id=user.id).delete()
+    UserDataChange.query.filter_by(user_id=user.id).delete()
     db.session.delete(user)
     db.session.commit()
     
@@ -872,8 +1221,12 @@ def set_language(lang):
     return redirect(request.referrer or url_for('dashboard'))
 
 if __name__ == '__main__':
+    compile_translations_if_needed()
+
     with app.app_context():
         db.create_all()
+        create_missing_indexes()
+        ensure_monthly_summary()
         
         # Make user 'iwery' admin
         iwery = User.query.filter_by(username='iwery').first()